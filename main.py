@@ -1,10 +1,12 @@
 from enum import Enum
 from configparser import ConfigParser, NoSectionError
-import pickle
-from collections import defaultdict
+from math import atan2, cos, hypot, sin, tau
+import json
+import random
+import threading
+from collections import defaultdict, OrderedDict
 
 import numpy as np
-from numpy.linalg import norm
 import pygame
 from pygame import gfxdraw
 
@@ -17,8 +19,32 @@ PALETTES = {'default': [(255, 221, 74), (23, 190, 187), (241, 113, 5), (177, 24,
             'negative': [(0, 34, 181), (232, 65, 68), (14, 142, 250), (78, 231, 55), (255, 207, 182)],
             'autumn': [(243, 188, 46), (212, 91, 81), (156, 39, 6), (95, 84, 38), (96, 60, 20)],
             'winter': [(7, 6, 0), (4, 138, 129), (52, 84, 209), (192, 232, 249), (252, 252, 255)]}
-PALETTES = {key: [np.array(x) for x in val] for key, val in PALETTES.items()}
+PALETTES = {key: np.array(val, dtype=np.int16) for key, val in PALETTES.items()}
 HARD_LIMIT = 50
+WORD_LENGTHS = list(range(5, 11))
+
+# draw layers, back to front
+LAYER_SHADOW = 0
+LAYER_LASER = 1
+LAYER_LASER_CORE = 2
+LAYER_SIDE = 3
+LAYER_NOSE = 4
+LAYER_NOSE_TIP = 5
+LAYER_BODY = 6
+LAYER_BODY_MID = 7
+LAYER_BODY_CORE = 8
+LAYER_DEBRIS = 9
+LAYER_DEBRIS_CORE = 10
+LAYER_TEXT = 11
+
+
+def op_order(item):
+    layer, op = item
+    if op[0] == 'circle':
+        return layer, op[0], op[4]
+    if op[0] == 'polygon':
+        return layer, op[0], tuple(op[2])
+    return layer, op[0], ()
 
 
 def key_name(key):
@@ -35,9 +61,8 @@ def key_name(key):
 
 
 def random_unit():
-    r = 2 * np.random.uniform(size=2) - 1
-    r /= np.linalg.norm(r)
-    return r
+    angle = tau * random.random()
+    return pygame.Vector2(cos(angle), sin(angle))
     
     
 def shade(color, darkness):
@@ -54,6 +79,59 @@ class State(Enum):
     OPTIONS = 3
 
 
+class FramePalette:
+    def __init__(self, palette, brightness, flash_color):
+        self.palette = palette
+        self.brightness = brightness
+        self.flash_color = flash_color
+        self.raw = [tuple(color) for color in palette.tolist()]
+        if brightness:
+            blended = ((1 - brightness) * palette + brightness * np.asarray(flash_color)).astype(np.int16)
+            self.base = [tuple(color) for color in blended.tolist()]
+        else:
+            self.base = self.raw
+        self.derived = {}
+
+    def blend(self, color):
+        if self.brightness:
+            color = (1 - self.brightness) * color + self.brightness * self.flash_color
+        return tuple(int(c) for c in color)
+
+    def shaded(self, index, darkness):
+        key = (index, -darkness)
+        color = self.derived.get(key)
+        if color is None:
+            color = self.blend(shade(self.palette[index], darkness))
+            self.derived[key] = color
+        return color
+
+    def tinted(self, index, lightness):
+        key = (index, lightness)
+        color = self.derived.get(key)
+        if color is None:
+            color = self.blend(tint(self.palette[index], lightness))
+            self.derived[key] = color
+        return color
+
+
+class LazySound:
+    def __init__(self, path):
+        self.path = path
+        self.sound = None
+        self.volume = 1.0
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self.sound is not None:
+            self.sound.set_volume(volume)
+
+    def play(self):
+        if self.sound is None:
+            self.sound = pygame.mixer.Sound(self.path)
+            self.sound.set_volume(self.volume)
+        self.sound.play()
+
+
 class Main:
     def __init__(self):
         pygame.mixer.pre_init(44100, -16, 2, 2048)
@@ -68,6 +146,7 @@ class Main:
         self.player = Player()
         self.enemies = []
         self.lasers = []
+        self.used_letters = set()
         self.camera = Camera()
         
         self.words = dict()
@@ -83,13 +162,12 @@ class Main:
         
         self.sounds = dict()
         for sound in ['laser', 'explosion', 'error', 'select']:
-            self.sounds[sound] = pygame.mixer.Sound(f'./sound/{sound}.wav')
-        pygame.mixer.music.load('./sound/words.mp3')
+            self.sounds[sound] = LazySound(f'./sound/{sound}.wav')
 
         try:
-            with open('save', 'rb') as f:
-                self.high_score = pickle.load(f)
-        except FileNotFoundError:
+            with open('save', 'r') as f:
+                self.high_score = {lan: defaultdict(int, scores) for lan, scores in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
             self.high_score = dict()
         
         self.menu_index = 0
@@ -110,6 +188,8 @@ class Main:
                                'MUSIC VOLUME': 8,
                              }
                            
+        self.applied_options = dict()
+
         self.config = ConfigParser()
         try:
             self.config.read('config.ini')
@@ -119,76 +199,94 @@ class Main:
             self.config.add_section('OPTIONS')
 
         self.apply_options()
-        
+
+        threading.Thread(target=self.start_music, daemon=True).start()
+
+    def start_music(self):
+        pygame.mixer.music.load('./sound/words.mp3')
         pygame.mixer.music.play(-1)
 
     def load_words(self, path):
-        self.words.clear()
         with open(f'./languages/{path}.txt', 'r', encoding='utf-8') as f:
-            for line in f.readlines():
-                word = line.strip().lower()
-                if not word.isalpha():
-                    continue
-                    
-                if len(word) in self.words:
-                    self.words[len(word)].append(word)
-                else:
-                    self.words[len(word)] = [word]
+            data = f.read()
+
+        buckets = defaultdict(list)
+        for line in data.splitlines():
+            word = line.strip().lower()
+            if WORD_LENGTHS[0] <= len(word) <= WORD_LENGTHS[-1] and word.isalpha():
+                buckets[len(word)].append(word)
+
+        self.words = {length: tuple(words) for length, words in buckets.items()}
         
     def add_enemy(self):
-        used_letters = set()
-        for enemy in self.enemies:
-            if enemy.word:
-                used_letters.add(enemy.word[0])
-            
-        length = np.random.choice(list(range(5, 11)))
+        length = random.choice(WORD_LENGTHS)
         while True:
-            word = np.random.choice(self.words[length])
-            if word[0] not in used_letters:
+            word = random.choice(self.words[length])
+            if word[0] not in self.used_letters:
                 break
-        
+
+        self.used_letters.add(word[0])
+
+        for i in range(len(word)):
+            self.camera.render_text(self.palette[0], word[i:])
+            self.camera.render_text(self.palette[1], word[i:])
+
         self.enemies.append(Enemy(word))
         
     def options_value(self, option):
         return self.options_values[option][self.options_index[option]]
         
     def apply_options(self):
-        res = [int(x) for x in self.options_value('RESOLUTION').split('x')]
-        if self.options_value('FULLSCREEN') == 'on':
-            self.screen = pygame.display.set_mode(res, pygame.FULLSCREEN)
-        else:
-            self.screen = pygame.display.set_mode(res)
-        self.camera.zoom = 100 / 720 * res[1]
-        self.camera.font = pygame.font.SysFont('Arial', int(28 * self.camera.zoom / 100))
-        
-        vol = float(self.options_value('SFX VOLUME')) / 100
-        for sound in self.sounds.values():
-            sound.set_volume(vol)
-            
-        vol = float(self.options_value('MUSIC VOLUME')) / 100
-        pygame.mixer.music.set_volume(vol)
-        
-        self.load_words(self.options_value('LANGUAGE'))
-        
-        self.palette = PALETTES[self.options_value('PALETTE')]
-        self.camera.color = self.palette[0]
-        
+        changed = {op for op in self.options if self.applied_options.get(op) != self.options_index[op]}
+        if not changed:
+            return
+
+        if 'RESOLUTION' in changed or 'FULLSCREEN' in changed:
+            res = [int(x) for x in self.options_value('RESOLUTION').split('x')]
+            if self.options_value('FULLSCREEN') == 'on':
+                self.screen = pygame.display.set_mode(res, pygame.FULLSCREEN)
+            else:
+                self.screen = pygame.display.set_mode(res)
+            self.camera.zoom = 100 / 720 * res[1]
+            self.camera.clear_caches()
+
+        if 'SFX VOLUME' in changed:
+            vol = float(self.options_value('SFX VOLUME')) / 100
+            for sound in self.sounds.values():
+                sound.set_volume(vol)
+
+        if 'MUSIC VOLUME' in changed:
+            vol = float(self.options_value('MUSIC VOLUME')) / 100
+            pygame.mixer.music.set_volume(vol)
+
+        if 'LANGUAGE' in changed:
+            self.load_words(self.options_value('LANGUAGE'))
+
+            if self.options_value('LANGUAGE') not in self.high_score:
+                self.high_score[self.options_value('LANGUAGE')] = defaultdict(int)
+
+        if 'PALETTE' in changed:
+            self.palette = PALETTES[self.options_value('PALETTE')]
+            self.camera.color = self.palette[0]
+
         for op in self.options:
             self.config.set('OPTIONS', op, self.options_value(op))
-            
+
         with open('config.ini', 'w') as f:
             self.config.write(f)
-            
-        if self.options_value('LANGUAGE') not in self.high_score:
-            self.high_score[self.options_value('LANGUAGE')] = defaultdict(int)
+
+        self.applied_options = dict(self.options_index)
             
     def save_score(self):
         lan = self.options_value('LANGUAGE')
 
-        self.high_score[lan][self.difficulty] = max(self.score, self.high_score[lan][self.difficulty])
-        
-        with open('save', 'wb') as f:
-            pickle.dump(self.high_score, f)
+        if self.score <= self.high_score[lan][self.difficulty]:
+            return
+
+        self.high_score[lan][self.difficulty] = self.score
+
+        with open('save', 'w') as f:
+            json.dump({lan: dict(scores) for lan, scores in self.high_score.items()}, f)
             
     def new_game(self, difficulty):
         self.state = State.PLAY
@@ -197,13 +295,14 @@ class Main:
         self.score = 0
         self.hits = 0
         self.shots = 0
-        self.camera.velocity[:] = 0.0
+        self.camera.velocity.update(0, 0)
         self.time = 0.0
         self.player.alive = True
-        self.player.direction[:] = [1, 0]
+        self.player.direction.update(1, 0)
         self.sounds['select'].play()
         self.difficulty = difficulty
         self.selection = None
+        self.used_letters.clear()
         
     def end_game(self):
         self.camera.brightness = 0.5
@@ -270,6 +369,7 @@ class Main:
                     self.state = State.MENU
                     self.menu_index = 0
                     self.enemies.clear()
+                    self.used_letters.clear()
                     self.sounds['error'].play()
                 elif self.player.alive:
                     name = key_name(event.key)
@@ -290,11 +390,14 @@ class Main:
                     if self.selection:
                         if self.selection.word[0] == name:
                             self.selection.damage()
+                            self.used_letters.discard(name)
+                            if self.selection.word:
+                                self.used_letters.add(self.selection.word[0])
                             self.lasers.append(Laser(self.selection.position))
-                            r = self.selection.position / norm(self.selection.position)
+                            r = self.selection.position.normalize()
                             self.player.direction = r
-                            self.player.debris.append(Debris(1.5 * r * self.player.radius, 0.25 * r, 
-                                                             0.5 * self.player.radius, 3))
+                            self.player.debris.add(1.5 * r * self.player.radius, 0.25 * r,
+                                                   0.5 * self.player.radius, 3)
                             self.camera.shake(0.5)
                             self.hits += 1
                             self.sounds['laser'].play()
@@ -332,27 +435,28 @@ class Main:
                 if self.player.health:
                     enemy.update(time_step)
                 
-                    if norm(self.player.position - enemy.position) < enemy.radius + 0.5 * self.player.radius:
+                    threshold = enemy.radius + 0.5 * self.player.radius
+                    dx = enemy.position.x - self.player.position.x
+                    dy = enemy.position.y - self.player.position.y
+                    if abs(dx) < threshold and abs(dy) < threshold and dx * dx + dy * dy < threshold * threshold:
                         self.end_game()
                         break
-                    
-                if not enemy.alive and not enemy.debris:
-                    self.enemies.remove(enemy)
-            
+
+            self.enemies[:] = [enemy for enemy in self.enemies if enemy.alive or enemy.debris]
+
             for laser in self.lasers:
                 laser.update(time_step)
-                if norm(laser.start) > norm(laser.target):
-                    self.lasers.remove(laser)
+            self.lasers[:] = [laser for laser in self.lasers if 0.5 + laser.travel <= laser.target_distance]
         
     def draw(self):
-        b = self.camera.brightness
-        self.screen.fill((1 - b) * self.palette[4] + b * self.camera.color)
+        palette = FramePalette(self.palette, self.camera.brightness, self.camera.color)
+        self.screen.fill(palette.base[4])
         
         if self.state is State.MENU:
             lan = self.options_value("LANGUAGE")
             
             for i, b in enumerate(self.menu_buttons):
-                color = self.palette[0] if i == self.menu_index else self.palette[1]
+                color = palette.raw[0] if i == self.menu_index else palette.raw[1]
                 
                 if b == 'HARD':     
                     if self.high_score[lan]['normal'] >= HARD_LIMIT:
@@ -371,47 +475,48 @@ class Main:
             pos = np.array([self.camera.position[0], 2.0])
             title = 'TYPER: A'
             size = 256
-            self.camera.draw_text(self.screen, shade(self.palette[4], 0.2), pos + 0.2 * np.array([1, -1]), title, size)
-            self.camera.draw_text(self.screen, self.palette[2], pos + 0.05 * np.array([1, -1]), title, size)
-            self.camera.draw_text(self.screen, self.palette[0], pos, title, size)
+            self.camera.draw_text(self.screen, palette.shaded(4, 0.2), pos + 0.2 * np.array([1, -1]), title, size)
+            self.camera.draw_text(self.screen, palette.raw[2], pos + 0.05 * np.array([1, -1]), title, size)
+            self.camera.draw_text(self.screen, palette.raw[0], pos, title, size)
         elif self.state is State.OPTIONS:
-            self.camera.draw_text(self.screen, self.palette[1], self.camera.position + np.array([-5, -3]), 
+            self.camera.draw_text(self.screen, palette.raw[1], self.camera.position + np.array([-5, -3]), 
                                   'ESC: back')
-            self.camera.draw_text(self.screen, self.palette[1], self.camera.position + np.array([5, -3]), 
+            self.camera.draw_text(self.screen, palette.raw[1], self.camera.position + np.array([5, -3]), 
                                   'ENTER: apply')
                                   
             for i, b in enumerate(self.options):
-                color = self.palette[0] if i == self.menu_index else self.palette[1]
+                color = palette.raw[0] if i == self.menu_index else palette.raw[1]
                 self.camera.draw_text(self.screen, color, np.array([self.camera.position[0], 2.5 - i]), b)
                 self.camera.draw_text(self.screen, color, np.array([self.camera.position[0], 2.2 - i]),
                                       self.options_value(b))
         elif self.state is State.PLAY:
             for enemy in self.enemies:
-                enemy.draw_shadow(self.screen, self.camera, self.palette)
+                enemy.draw_shadow(self.screen, self.camera, palette)
                     
-            self.player.draw_shadow(self.screen, self.camera, self.palette)
+            self.player.draw_shadow(self.screen, self.camera, palette)
                 
             for laser in self.lasers:
-                laser.draw(self.screen, self.camera, self.palette)
+                laser.draw(self.screen, self.camera, palette)
                     
-            self.player.draw(self.screen, self.camera, self.palette)
+            self.player.draw(self.screen, self.camera, palette)
                     
             for enemy in self.enemies:
-                enemy.draw(self.screen, self.camera, self.palette)
+                enemy.draw(self.screen, self.camera, palette)
                 
             for enemy in self.enemies:
-                enemy.draw_text(self.screen, self.camera, self.palette)
+                enemy.draw_text(self.screen, self.camera, palette)
                     
             if self.player.health == 0 and not self.player.debris:
                 self.selection = None
                 self.enemies.clear()
+                self.used_letters.clear()
                 self.state = State.MENU
                 
-            self.camera.draw_text(self.screen, self.palette[0], np.array([0.0, -2.4]), f'TIME: {int(self.time / 6)}')
-            self.camera.draw_text(self.screen, self.palette[0], np.array([0.0, 2.5]), f'{self.score}', 128)
+            self.camera.draw_text(self.screen, palette.raw[0], np.array([0.0, -2.4]), f'TIME: {int(self.time / 6)}')
+            self.camera.draw_text(self.screen, palette.raw[0], np.array([0.0, 2.5]), f'{self.score}', 128)
             acc = int(self.hits / self.shots * 100) if self.shots else 0
-            self.camera.draw_text(self.screen, self.palette[0], np.array([0.0, -2.8]), f'ACC: {acc} %')
-            self.camera.draw_text(self.screen, self.palette[0], np.array([0.0, -3.2]), f'WPM: {int(360 * self.score / (self.time + 1e-6))}')
+            self.camera.draw_text(self.screen, palette.raw[0], np.array([0.0, -2.8]), f'ACC: {acc} %')
+            self.camera.draw_text(self.screen, palette.raw[0], np.array([0.0, -3.2]), f'WPM: {int(360 * self.score / (self.time + 1e-6))}')
 
 
     def main_loop(self):
@@ -422,7 +527,10 @@ class Main:
             fps = self.clock.get_fps()
             
             self.update(0.1 * 60 / (fps + 1e-6))
+
+            self.camera.begin_batch()
             self.draw()
+            self.camera.flush(self.screen)
             
             #self.camera.draw_text(self.screen, self.palette[0], 
             #                      self.camera.position + np.array([6, 3.4]), f'{fps:.2f}')
@@ -433,146 +541,296 @@ class Main:
 
 class Camera:
     def __init__(self):
-        self.origin = np.array([5.0, 0.0])
-        self.position = np.array([5.0, 0.0])
+        self.origin = pygame.Vector2(5.0, 0.0)
+        self.position = pygame.Vector2(5.0, 0.0)
         self.zoom = 100
-        self.font = pygame.font.SysFont('Arial', int(28))
         self.center = np.array([-1280, 720]) * 0.5 / self.zoom
-        self.velocity = np.zeros(2)
+        self.velocity = pygame.Vector2()
         self.brightness = 0.0
         self.color = 255 * np.ones(3)
-        
+        self.batch = None
+        self.circle_cache = {}
+        self.ellipse_cache = {}
+        self.fonts = {}
+        self.text_cache = OrderedDict()
+
+    def clear_caches(self):
+        self.circle_cache.clear()
+        self.ellipse_cache.clear()
+        self.fonts.clear()
+        self.text_cache.clear()
+
+    def circle_surface(self, rad, color):
+        key = (rad, color)
+        surf = self.circle_cache.get(key)
+        if surf is None:
+            if len(self.circle_cache) > 1024:
+                self.circle_cache.clear()
+            surf = pygame.Surface((2 * rad + 2, 2 * rad + 2), pygame.SRCALPHA)
+            gfxdraw.aacircle(surf, rad + 1, rad + 1, rad, color)
+            gfxdraw.filled_circle(surf, rad + 1, rad + 1, rad, color)
+            self.circle_cache[key] = surf
+        return surf
+
+    def render_text(self, color, string, size=28):
+        key = (string, size, tuple(int(c) for c in color))
+        surf = self.text_cache.get(key)
+        if surf is None:
+            font = self.fonts.get(size)
+            if font is None:
+                font = pygame.font.SysFont('Arial', int(size * self.zoom / 100))
+                self.fonts[size] = font
+            surf = font.render(string, True, color)
+            self.text_cache[key] = surf
+            if len(self.text_cache) > 512:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surf
+
+    def begin_batch(self):
+        self.batch = []
+
+    def flush(self, screen):
+        batch = self.batch
+        self.batch = None
+        batch.sort(key=op_order)
+
+        blits = []
+        for layer, op in batch:
+            if op[0] == 'circle':
+                _, x, y, rad, color = op
+                blits.append((self.circle_surface(rad, color), (x - rad - 1, y - rad - 1)))
+            elif op[0] == 'blit':
+                blits.append((op[1], (op[2], op[3])))
+            else:
+                if blits:
+                    screen.blits(blits)
+                    blits = []
+                self.render(screen, op)
+
+        if blits:
+            screen.blits(blits)
+
+    def render(self, screen, op):
+        if op[0] == 'circle':
+            _, x, y, rad, color = op
+            gfxdraw.aacircle(screen, x, y, rad, color)
+            gfxdraw.filled_circle(screen, x, y, rad, color)
+        elif op[0] == 'polygon':
+            _, points, color = op
+            gfxdraw.aapolygon(screen, points, color)
+            gfxdraw.filled_polygon(screen, points, color)
+        else:
+            _, surf, x, y = op
+            screen.blit(surf, (x, y))
+
+    def submit(self, screen, op, layer=0):
+        if self.batch is None:
+            self.render(screen, op)
+        else:
+            self.batch.append((layer, op))
+
     def shake(self, intensity):
         r = intensity * random_unit()
         self.velocity += r
         
     def update(self, time_step):
+        self.brightness = max(0, self.brightness - 0.5 * time_step)
+
+        if self.velocity.x == 0 and self.velocity.y == 0:
+            return
+
         r = self.position - self.origin
         self.velocity += -2 * (5 * r + self.velocity) * time_step
         self.position += self.velocity * time_step
-        if norm(self.velocity) < 0.01:
-            self.velocity[:] = 0.0
-            
-        self.brightness = max(0, self.brightness - 0.5  * time_step)
+        if self.velocity.length() < 0.01:
+            self.velocity.update(0, 0)
 
     def world_to_screen(self, position):
-        pos = [int(self.zoom * x) for x in position - self.position - self.center]
-        pos[1] *= -1
-        return pos
+        x = int(self.zoom * (position[0] - self.position[0] - self.center[0]))
+        y = -int(self.zoom * (position[1] - self.position[1] - self.center[1]))
+        return [x, y]
 
-    def draw_circle(self, screen, color, position, radius):
-        color = (1 - self.brightness) * color + self.brightness * self.color
+    def world_to_screen_batch(self, positions):
+        pos = (np.asarray(positions) - self.position - self.center) * self.zoom
+        pos[:, 1] *= -1
+        return pos.astype(int)
+
+    def draw_circle(self, screen, color, position, radius, layer=0):
         rad = int(radius * self.zoom)
-        gfxdraw.aacircle(screen, *self.world_to_screen(position), rad, color)
-        gfxdraw.filled_circle(screen, *self.world_to_screen(position), rad, color)
-        
-    def draw_ellipse(self, screen, color, position, width, height, angle=0.0):
+        pos = self.world_to_screen(position)
+        self.submit(screen, ('circle', pos[0], pos[1], rad, color), layer)
+
+    def draw_ellipse(self, screen, color, position, width, height, angle=0.0, layer=0):
         w = int(width * self.zoom)
         h = int(height * self.zoom)
-        
-        surf = pygame.Surface((3 * w, 3 * h), pygame.SRCALPHA, 32)
-        
-        color = (1 - self.brightness) * color + self.brightness * self.color
-        x, y = surf.get_rect().center
-        gfxdraw.aaellipse(surf, x, y, w, h, color)
-        gfxdraw.filled_ellipse(surf, x, y, w, h, color)
-        
-        surf = pygame.transform.rotate(surf, np.rad2deg(angle))
-        
+
+        key = (w, h, color, int(angle * 32))
+        surf = self.ellipse_cache.get(key)
+        if surf is None:
+            if len(self.ellipse_cache) > 512:
+                self.ellipse_cache.clear()
+            surf = pygame.Surface((3 * w, 3 * h), pygame.SRCALPHA, 32)
+
+            x, y = surf.get_rect().center
+            gfxdraw.aaellipse(surf, x, y, w, h, color)
+            gfxdraw.filled_ellipse(surf, x, y, w, h, color)
+
+            surf = pygame.transform.rotate(surf, np.rad2deg(angle))
+            self.ellipse_cache[key] = surf
+
         x, y = surf.get_rect().center
         pos = self.world_to_screen(position)
-        screen.blit(surf, (pos[0] - x, pos[1] - y))
-        
+        self.submit(screen, ('blit', surf, pos[0] - x, pos[1] - y), layer)
+
     def draw_text(self, screen, color, position, string, size=28):
-        font = self.font if size == 28 else pygame.font.SysFont('Arial', int(size * self.zoom / 100))
-        surf = font.render(string, True, color)
+        surf = self.render_text(color, string, size)
         x, y = surf.get_rect().center
         pos = self.world_to_screen(position)
-        screen.blit(surf, (pos[0] - x, pos[1] - y))
-        
-    def draw_line(self, screen, color, start, end, width):
-        color = (1 - self.brightness) * color + self.brightness * self.color
+        self.submit(screen, ('blit', surf, pos[0] - x, pos[1] - y), LAYER_TEXT)
+
+    def draw_line(self, screen, color, start, end, width, layer=0):
         r = end - start
-        n = 0.5 * width * np.array([-r[1], r[0]]) / norm(r)
-        
+        n = 0.5 * width / hypot(r[0], r[1]) * pygame.Vector2(-r[1], r[0])
+
         a = start + n
         b = a + r
         c = b - 2 * n
         d = c - r
-        
+
         points = list(map(self.world_to_screen, [a, b, c, d]))
-        
-        gfxdraw.aapolygon(screen, points, color)
-        gfxdraw.filled_polygon(screen, points, color)
-        
-        self.draw_circle(screen, color, start, 0.5 * width)
-        self.draw_circle(screen, color, end, 0.5 * width)
+
+        self.submit(screen, ('polygon', points, color), layer)
+
+        self.draw_circle(screen, color, start, 0.5 * width, layer)
+        self.draw_circle(screen, color, end, 0.5 * width, layer)
         
             
 class Laser:
     def __init__(self, target):
-        self.target = target
-        self.direction = self.target / norm(self.target)
+        self.target_distance = target.length()
+        self.direction = target.normalize()
+        self.travel = 0.0
         self.start = 0.5 * self.direction
         self.end = 2.5 * self.direction
         self.speed = 10.0
         
     def update(self, time_step):
-        self.start += self.speed * self.direction * time_step
-        self.end += self.speed * self.direction * time_step
-        if norm(self.end) > norm(self.target):
-            self.end[:] = self.target
+        self.travel += self.speed * time_step
+        self.start = (0.5 + self.travel) * self.direction
+        self.end = min(2.5 + self.travel, self.target_distance) * self.direction
         
     def draw(self, screen, camera, palette):
-        camera.draw_line(screen, palette[3], self.start, self.end, 0.1)
-        camera.draw_line(screen, tint(palette[3], 0.5), self.start, self.end, 0.03)
+        camera.draw_line(screen, palette.base[3], self.start, self.end, 0.1, LAYER_LASER)
+        camera.draw_line(screen, palette.tinted(3, 0.5), self.start, self.end, 0.03, LAYER_LASER_CORE)
             
         
+class DebrisBatch:
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.position = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.radius = np.zeros(capacity)
+        self.color = np.zeros(capacity, dtype=int)
+        self.shading = np.zeros(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, position, velocity, radius, color, shading=0.3):
+        capacity = len(self.radius)
+        if self.count == capacity:
+            self.position = np.resize(self.position, (2 * capacity, 2))
+            self.velocity = np.resize(self.velocity, (2 * capacity, 2))
+            self.radius = np.resize(self.radius, 2 * capacity)
+            self.color = np.resize(self.color, 2 * capacity)
+            self.shading = np.resize(self.shading, 2 * capacity)
+
+        i = self.count
+        self.position[i] = position
+        self.velocity[i] = velocity
+        self.radius[i] = radius
+        self.color[i] = color
+        self.shading[i] = shading
+        self.count += 1
+
+    def update(self, time_step):
+        n = self.count
+        if not n:
+            return
+
+        self.position[:n] += self.velocity[:n] * time_step
+        self.radius[:n] = np.maximum(0, self.radius[:n] - 0.1 * time_step)
+
+        alive = self.radius[:n] > 0
+        m = int(alive.sum())
+        if m < n:
+            self.position[:m] = self.position[:n][alive]
+            self.velocity[:m] = self.velocity[:n][alive]
+            self.radius[:m] = self.radius[:n][alive]
+            self.color[:m] = self.color[:n][alive]
+            self.shading[:m] = self.shading[:n][alive]
+            self.count = m
+
+    def draw(self, screen, camera, palette):
+        n = self.count
+        if not n:
+            return
+
+        offset = (0.3 * self.radius[:n])[:, np.newaxis] * np.array([-1.0, 1.0])
+        points = camera.world_to_screen_batch(np.vstack([self.position[:n], self.position[:n] + offset])).tolist()
+        radii = (self.radius[:n] * camera.zoom).astype(int).tolist()
+        highlight_radii = (0.9 * self.radius[:n] * camera.zoom).astype(int).tolist()
+
+        for i in range(n):
+            color_index = self.color[i]
+            camera.submit(screen, ('circle', points[i][0], points[i][1], radii[i],
+                                   palette.shaded(color_index, self.shading[i])), LAYER_DEBRIS)
+            camera.submit(screen, ('circle', points[n + i][0], points[n + i][1], highlight_radii[i],
+                                   palette.base[color_index]), LAYER_DEBRIS_CORE)
+
+
 class Object:
     def __init__(self, position, radius, color):
         self.position = position.copy()
-        self.debris = []
+        self.debris = DebrisBatch()
         self.radius = radius
         self.color = color
         self.alive = True
-        
+
     def update(self, time_step):
-        for d in self.debris:
-            d.update(time_step)
-            if d.radius == 0:
-                self.debris.remove(d)
+        self.debris.update(time_step)
 
     def destroy(self):
         self.alive = False
         for _ in range(5):
-            self.debris.append(Debris(self.position, 0.5 * random_unit(), 0.75 * self.radius, 3))
+            self.debris.add(self.position, 0.5 * random_unit(), 0.75 * self.radius, 3)
         for _ in range(5):
-            self.debris.append(Debris(self.position, 0.5 * random_unit(), 0.75 * self.radius, self.color))
-                
+            self.debris.add(self.position, 0.5 * random_unit(), 0.75 * self.radius, self.color)
+
     def draw(self, screen, camera, palette):
         if self.alive:
-            offset = 0.05 * self.radius * np.array([self.position[0] - 5, self.position[1]])
-            camera.draw_circle(screen, palette[self.color], self.position + offset, 0.9 * self.radius)
-            camera.draw_circle(screen, tint(palette[self.color], 0.4), self.position + offset, 0.7 * self.radius)
-            camera.draw_circle(screen, palette[self.color], self.position + offset, 0.4 * self.radius)
+            offset = 0.05 * self.radius * pygame.Vector2(self.position[0] - 5, self.position[1])
+            camera.draw_circle(screen, palette.base[self.color], self.position + offset, 0.9 * self.radius, LAYER_BODY)
+            camera.draw_circle(screen, palette.tinted(self.color, 0.4), self.position + offset, 0.7 * self.radius, LAYER_BODY_MID)
+            camera.draw_circle(screen, palette.base[self.color], self.position + offset, 0.4 * self.radius, LAYER_BODY_CORE)
 
-        for d in self.debris:
-            d.draw(screen, camera, palette)
+        self.debris.draw(screen, camera, palette)
             
     def draw_side(self, screen, camera, palette):
-        camera.draw_circle(screen, shade(palette[self.color], 0.2), self.position, self.radius)
+        camera.draw_circle(screen, palette.shaded(self.color, 0.2), self.position, self.radius, LAYER_SIDE)
             
     def draw_shadow(self, screen, camera, palette):
         if self.alive:
-            color = 0.8 * np.array(palette[4])
-            camera.draw_circle(screen, color, self.position + 0.1 * np.array([1, -1]), 1.1 * self.radius)
+            camera.draw_circle(screen, palette.shaded(4, 0.2), self.position + pygame.Vector2(0.1, -0.1), 1.1 * self.radius, LAYER_SHADOW)
 
         
 class Player(Object):
     def __init__(self):
-        super().__init__(np.zeros(2), 0.5, 1)
+        super().__init__(pygame.Vector2(), 0.5, 1)
         self.health = 1
-        self.direction = np.array([1, 0])
+        self.direction = pygame.Vector2(1, 0)
         
     def damage(self):
         self.health -= 1
@@ -584,8 +842,8 @@ class Player(Object):
         if self.alive:
             self.draw_side(screen, camera, palette)
             
-            camera.draw_line(screen, palette[self.color], self.position, self.position + 0.5 * self.direction, 0.5)
-            camera.draw_ellipse(screen, shade(palette[self.color], 0.2), self.position + 0.6 * self.direction, 0.1, 0.15, np.arctan2(*self.direction[::-1]))
+            camera.draw_line(screen, palette.base[self.color], self.position, self.position + 0.5 * self.direction, 0.5, LAYER_NOSE)
+            camera.draw_ellipse(screen, palette.shaded(self.color, 0.2), self.position + 0.6 * self.direction, 0.1, 0.15, atan2(self.direction[1], self.direction[0]), LAYER_NOSE_TIP)
                         
         super().draw(screen, camera, palette)
 
@@ -593,20 +851,20 @@ class Player(Object):
 class Enemy(Object):
     def __init__(self, word):
         self.word = word
-        pos = np.array([12.0, 8 * np.random.uniform() - 4])
+        pos = pygame.Vector2(12.0, 8 * random.random() - 4)
         
         super().__init__(pos, len(self.word) / 20, 2)
 
         self.speed = 2 / len(self.word)
         self.selected = False
-        self.velocity = np.zeros(2)
+        self.velocity = pygame.Vector2()
         self.timer = 0.0
 
     def update(self, time_step):
         if self.alive:
-            r = -self.position / norm(self.position)
+            r = -self.position.normalize()
             self.velocity += r * time_step
-            speed = norm(self.velocity)
+            speed = self.velocity.length()
             if speed > self.speed:
                 self.velocity *= self.speed / speed
             self.position += self.velocity * time_step
@@ -617,14 +875,14 @@ class Enemy(Object):
     
     def damage(self):
         self.word = self.word[1:]
-        r = self.position / norm(self.position)
+        r = self.position.normalize()
         self.velocity += r
         self.timer = 0.5
         
         pos = self.position - r * self.radius
         rad = 0.5 * self.radius
         for _ in range(5):
-            self.debris.append(Debris(pos, 0.3 * random_unit(), rad, 3))
+            self.debris.add(pos, 0.3 * random_unit(), rad, 3)
 
         if not self.word:
             self.color = 2
@@ -639,28 +897,10 @@ class Enemy(Object):
         
     def draw_text(self, screen, camera, palette):
         if self.word:
-            color = palette[0] if self.selected else palette[1]
-            camera.draw_text(screen, color, self.position - np.array([0, -1.5 * self.radius]), self.word)
+            color = palette.raw[0] if self.selected else palette.raw[1]
+            camera.draw_text(screen, color, self.position + pygame.Vector2(0, 1.5 * self.radius), self.word)
             
             
-class Debris:
-    def __init__(self, position, velocity, radius, color, shading=0.3):
-        self.position = position.copy()
-        self.velocity = velocity.copy()
-        self.radius = radius
-        self.color = color
-        self.shading = shading
-        
-    def update(self, time_step):
-        self.position += self.velocity * time_step
-        self.radius = max(0, self.radius - 0.1 * time_step)
-        
-    def draw(self, screen, camera, palette):
-        camera.draw_circle(screen, shade(palette[self.color], self.shading), self.position, self.radius)
-        camera.draw_circle(screen, palette[self.color], self.position + 0.3 * self.radius * np.array([-1, 1]), 
-                           0.9 * self.radius)
-
-
 if __name__ == '__main__':
     main_window = Main()
     main_window.main_loop()